@@ -4,7 +4,6 @@
 
 from __future__ import absolute_import, division, print_function
 
-import copy
 import logging
 from math import acos, pi
 
@@ -70,33 +69,31 @@ def __repr__(self):
 
 def calc_crystal_frame_vectors(reflection_table, experiments):
     """Calculate the diffraction vectors in the crystal frame."""
-    reflection_table["s0"] = flex.vec3_double(
-        [experiments.beam.get_sample_to_source_direction()] * len(reflection_table)
-    )
+    s0 = experiments.beam.get_sample_to_source_direction()
+    reflection_table["s0"] = flex.vec3_double(len(reflection_table), s0)
     rot_axis = flex.vec3_double([experiments.goniometer.get_rotation_axis()])
     angles = reflection_table["phi"] * -1.0 * pi / 180  # want to do an inverse rot.
+    # Aligning first turns the rotation about rot_axis into a rotation about z,
+    # so the constant s0 only needs to be aligned once rather than per reflection.
+    z_axis = flex.vec3_double([(0.0, 0.0, 1.0)])
+    s0_aligned = align_rotation_axis_along_z(rot_axis, flex.vec3_double([s0]))[0]
     reflection_table["s1c"] = rotate_vectors_about_axis(
-        rot_axis, reflection_table["s1"], angles
+        z_axis, align_rotation_axis_along_z(rot_axis, reflection_table["s1"]), angles
     )
     reflection_table["s0c"] = rotate_vectors_about_axis(
-        rot_axis, reflection_table["s0"], angles
-    )
-    reflection_table["s1c"] = align_rotation_axis_along_z(
-        rot_axis, reflection_table["s1c"]
-    )
-    reflection_table["s0c"] = align_rotation_axis_along_z(
-        rot_axis, reflection_table["s0c"]
+        z_axis, flex.vec3_double(len(reflection_table), s0_aligned), angles
     )
     return reflection_table
 
 
 def align_rotation_axis_along_z(exp_rot_axis, vectors):
     """Rotate the coordinate system such that the exp_rot_axis is along z."""
-    if list(exp_rot_axis) == [(0.0, 0.0, 1.0)]:
-        return vectors
     (ux, uy, uz) = exp_rot_axis[0][0], exp_rot_axis[0][1], exp_rot_axis[0][2]
+    norm = (ux ** 2 + uy ** 2 + uz ** 2) ** 0.5
+    if uz > 0 and (ux ** 2 + uy ** 2) < 1e-20 * norm ** 2:
+        return vectors  # already along z, to within rounding
     cross_prod_uz = flex.vec3_double([(uy, -1.0 * ux, 0.0)])
-    angle_between_u_z = +1.0 * acos(uz / ((ux ** 2 + uy ** 2 + uz ** 2) ** 0.5))
+    angle_between_u_z = +1.0 * acos(uz / norm)
     phi = flex.double(vectors.size(), angle_between_u_z)
     new_vectors = rotate_vectors_about_axis(cross_prod_uz, vectors, phi)
     return flex.vec3_double(new_vectors)
@@ -140,9 +137,9 @@ def quasi_normalisation(reflection_table, experiment):
     )
 
     # handle negative reflections to minimise effect on mean I values.
-    rt_subset["intensity_for_norm"] = copy.deepcopy(rt_subset["intensity"])
-    rt_subset["intensity_for_norm"].set_selected(rt_subset["intensity"] < 0.0, 0.0)
-    miller_array = miller.array(miller_set, data=rt_subset["intensity_for_norm"])
+    intensities = rt_subset["intensity"].deep_copy()
+    intensities.set_selected(intensities < 0.0, 0.0)
+    miller_array = miller.array(miller_set, data=intensities)
     n_refl = rt_subset.size()
 
     # set up binning objects
@@ -191,14 +188,12 @@ def set_wilson_outliers(reflection_table):
     values and sets an outlier flag depending on a cutoff for p < 1e-6."""
 
     centric_cutoff = 23.91
-    sel1 = reflection_table["centric_flag"]
-    sel2 = reflection_table["Esq"] > centric_cutoff  # probability <10^-6
-    reflection_table.set_flags(sel1 & sel2, reflection_table.flags.outlier_in_scaling)
-
     acentric_cutoff = 13.82
-    sel1 = ~reflection_table["centric_flag"]
-    sel2 = reflection_table["Esq"] > acentric_cutoff  # probability <10^-6
-    reflection_table.set_flags(sel1 & sel2, reflection_table.flags.outlier_in_scaling)
+    # per-reflection cutoff, so that a single comparison flags both classes
+    cutoffs = flex.double(reflection_table.size(), acentric_cutoff)
+    cutoffs.set_selected(reflection_table["centric_flag"], centric_cutoff)
+    sel = reflection_table["Esq"] > cutoffs  # probability <10^-6
+    reflection_table.set_flags(sel, reflection_table.flags.outlier_in_scaling)
     msg = (
         "{0} reflections have been identified as outliers based on their normalised {sep}"
         "intensity values. These are reflections that have a probablity of {sep}"
@@ -31,6 +31,7 @@
     calculate_harmonic_tables_from_selections,
     create_sph_harm_lookup_table,
     create_sph_harm_table,
+    rotate_vectors_about_axis,
 )
 
 
@@ -180,6 +181,36 @@ def test_calc_crystal_frame_vectors(test_reflection_table, mock_exp):
         assert v1 == pytest.approx(v2)
 
 
+@pytest.mark.parametrize(
+    "axis",
+    [
+        (1.0, 0.0, 0.0),
+        (0.0, 1.0, 0.0),
+        (2.0 / 7.0, -3.0 / 7.0, 6.0 / 7.0),
+        (-0.48, 0.6, -0.64),
+    ],
+)
+def test_calc_crystal_frame_vectors_non_z_axis(axis):
+    """Check that, for a rotation axis not along z, the result matches rotating
+    about the axis first and then aligning the axis along z."""
+    exp = Mock()
+    exp.beam.get_sample_to_source_direction.return_value = (1.0, 0.0, 0.0)
+    exp.goniometer.get_rotation_axis.return_value = axis
+    reflection_table = calc_crystal_frame_vectors(generate_reflection_table(), exp)
+
+    rot_axis = flex.vec3_double([axis])
+    angles = reflection_table["phi"] * -1.0 * pi / 180
+    for vectors, column in (
+        (reflection_table["s0"], "s0c"),
+        (reflection_table["s1"], "s1c"),
+    ):
+        expected = align_rotation_axis_along_z(
+            rot_axis, rotate_vectors_about_axis(rot_axis, vectors, angles)
+        )
+        for v1, v2 in zip(reflection_table[column], expected):
+            assert v1 == pytest.approx(v2)
+
+
 def test_align_rotation_axis_along_z():
     """Test the function to rotate the coordinate system such that the rotation
     axis is along z. In the test, the rotation axis is x, so we expect the
@@ -193,6 +224,10 @@ def test_align_rotation_axis_along_z():
     for v1, v2 in zip(rotated_vectors, expected):
         assert v1 == pytest.approx(v2)
 
+    # An axis along z to within rounding should leave the vectors unchanged.
+    rot_axis = flex.vec3_double([(1e-17, 0.0, 1.0)])
+    assert align_rotation_axis_along_z(rot_axis, vectors) is vectors
+
 
 def test_create_sph_harm_table(test_reflection_table, mock_exp):
     """Simple test for the spherical harmonic table, constructing the table step
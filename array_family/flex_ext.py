@@ -226,6 +226,13 @@ def from_file(filename):
         """
         Read the reflection table from either pickle or msgpack
         """
+        if filename and hasattr(filename, "__fspath__"):
+            filename = filename.__fspath__()
+        with libtbx.smart_open.for_reading(filename, "rb") as infile:
+            # pickle protocol 2 and above always starts with the PROTO opcode
+            is_pickle = infile.read(1) == b"\x80"
+        if is_pickle:
+            return dials_array_family_flex_ext.reflection_table.from_pickle(filename)
         try:
             return dials_array_family_flex_ext.reflection_table.from_msgpack_file(
                 filename
@@ -6,8 +6,6 @@
 import copy
 import os
 
-import six.moves.cPickle as pickle
-
 import iotbx.phil
 from cctbx import sgtbx
 from rstbx.symmetry.constraints import parameter_reduction
@@ -347,8 +345,7 @@ def run(args):
         reflections["miller_index"].set_selected(~sel, (0, 0, 0))
 
         print("Saving reindexed reflections to %s" % params.output.reflections)
-        with open(params.output.reflections, "wb") as fh:
-            pickle.dump(reflections, fh, protocol=pickle.HIGHEST_PROTOCOL)
+        reflections.as_file(params.output.reflections)
 
 
 if __name__ == "__main__":
@@ -1,18 +1,25 @@
 # LIBTBX_PRE_DISPATCHER_INCLUDE_SH export PHENIX_GUI_ENVIRONMENT=1
 from __future__ import absolute_import, division, print_function
 
+import concurrent.futures
+import functools
 import json
-import math
 import os
 import sys
 
 import matplotlib
+import numpy as np
 
 import iotbx.phil
+import libtbx.introspection
 from cctbx import crystal, miller
 from cctbx.array_family import flex
 from scitbx import matrix
 
+from dials.algorithms.indexing.compare_orientation_matrices import (
+    difference_rotation_matrix_axis_angle,
+)
+
 help_message = """
 
 Calculates a stereographic projection image for the given crystal models and
@@ -60,6 +67,9 @@
   .type = ints(size=3)
 save_coordinates = True
   .type = bool
+nproc = Auto
+  .type = int(value_min=1)
+  .help = "Number of threads to use when projecting multiple crystals"
 plot {
   filename = stereographic_projection.png
     .type = path
@@ -116,45 +126,50 @@ def stereographic_projection(points, reference_poles):
     # G. K. Stokes, S. R. Keown and D. J. Dyson
 
     assert len(reference_poles) == 3
-    r_0, r_1, r_2 = reference_poles
-
-    projections = flex.vec2_double()
-
-    for p in points:
-        r_i = matrix.col(p)
-        # theta is the angle between r_i and the plane normal, r_0
-        cos_theta = r_i.cos_angle(r_0)
-        if cos_theta < 0:
-            r_i = -r_i
-            cos_theta = r_i.cos_angle(r_0)
-
-        # alpha is the angle between r_i and r_1
-        cos_alpha = r_i.cos_angle(r_1)
-        theta = math.acos(cos_theta)
-        cos_phi = cos_alpha / math.sin(theta)
-        if abs(cos_phi) > 1:
-            cos_phi = math.copysign(1, cos_phi)
-        phi = math.acos(cos_phi)
+    poles = np.array([tuple(r) for r in reference_poles], dtype=float)
+    poles /= np.linalg.norm(poles, axis=1)[:, np.newaxis]
+
+    p = points.as_numpy_array()
+    norms = np.linalg.norm(p, axis=1)
+
+    # project each r_i onto r_0, r_1 and r_2 in a single product, flipping any
+    # r_i that points away from the plane normal
+    dots = p.dot(poles.T)
+    dots *= np.where(dots[:, 0] < 0, -1.0, 1.0)[:, np.newaxis]
+
+    # theta is the angle between r_i and the plane normal, r_0
+    cos_theta = np.clip(dots[:, 0] / norms, -1, 1)
+
+    # alpha is the angle between r_i and r_1
+    cos_alpha = dots[:, 1] / norms
+    theta = np.arccos(cos_theta)
+    sin_theta = np.sin(theta)
+    cos_phi = np.divide(
+        cos_alpha, sin_theta, out=np.ones_like(cos_alpha), where=sin_theta != 0
+    )
+    cos_phi = np.clip(cos_phi, -1, 1)
+    phi = np.arccos(cos_phi)
 
-        N = r_i.dot(r_2)
-        r = math.tan(theta / 2)
-        x = r * cos_phi
-        y = r * math.sin(phi)
-        y = math.copysign(y, N)
+    N = dots[:, 2]
+    r = np.tan(theta / 2)
+    x = r * cos_phi
+    y = np.where(N < 0, -1.0, 1.0) * r * np.sin(phi)
 
-        projections.append((x, y))
+    return flex.vec2_double(flex.double(x), flex.double(y))
 
-    return projections
 
+def project_miller_indices(A, hkl_vec3, reference_poles):
+    """Stereographic projection of the miller indices (as a vec3_double) for the
+    setting matrix A."""
+    return stereographic_projection(list(A) * hkl_vec3, reference_poles)
 
-def gcd_list(l):
-    # greatest common divisor for a list of numbers
-    from scitbx.math import gcd_int_simple as gcd
 
-    result = l[0]
-    for i in range(1, len(l)):
-        result = gcd(result, l[i])
-    return result
+def miller_indices_from_numpy(hkl):
+    """Convert an (n, 3) numpy array of integers to a flex.miller_index."""
+    h, k, l = (
+        flex.int(np.ascontiguousarray(column, dtype=np.int32)) for column in hkl.T
+    )
+    return flex.miller_index(h, k, l)
 
 
 def run(args):
@@ -191,13 +206,9 @@ def run(args):
         miller_indices = flex.miller_index(params.hkl)
     elif params.hkl_limit is not None:
         limit = params.hkl_limit
-        miller_indices = flex.miller_index()
-        for h in range(-limit, limit + 1):
-            for k in range(-limit, limit + 1):
-                for l in range(-limit, limit + 1):
-                    if (h, k, l) == (0, 0, 0):
-                        continue
-                    miller_indices.append((h, k, l))
+        hkl = np.mgrid[-limit : limit + 1, -limit : limit + 1, -limit : limit + 1]
+        hkl = hkl.reshape(3, -1).T
+        miller_indices = miller_indices_from_numpy(hkl[np.any(hkl != 0, axis=1)])
 
     crystals = experiments.crystals()
 
@@ -213,17 +224,11 @@ def run(args):
     miller_indices = d_spacings.indices()
 
     # find the greatest common factor (divisor) between miller indices
-    miller_indices_unique = flex.miller_index()
-    for hkl in miller_indices:
-        gcd = gcd_list(hkl)
-        if gcd > 1:
-            miller_indices_unique.append(tuple(int(h / gcd) for h in hkl))
-        elif gcd < 1:
-            pass
-        else:
-            miller_indices_unique.append(hkl)
-    miller_indices = miller_indices_unique
-    miller_indices = flex.miller_index(list(set(miller_indices)))
+    hkl = miller_indices.as_vec3_double().as_numpy_array().astype(int)
+    gcd = np.gcd.reduce(hkl, axis=1)
+    sel = gcd > 0
+    hkl = np.unique(hkl[sel] // gcd[sel, np.newaxis], axis=0)
+    miller_indices = miller_indices_from_numpy(hkl)
 
     ref_crystal = crystals[0]
     U = matrix.sqr(ref_crystal.get_U())
@@ -256,48 +261,52 @@ def run(args):
     if params.frame == "crystal":
         U = matrix.identity(3)
 
-    reciprocal_space_points = list(R * U * B) * miller_indices.as_vec3_double()
-    projections_ref = stereographic_projection(reciprocal_space_points, reference_poles)
-
-    projections_all = [projections_ref]
+    hkl_vec3 = miller_indices.as_vec3_double()
+    matrices = [R * U * B]
 
-    if experiments:
-        from dials.algorithms.indexing.compare_orientation_matrices import (
-            difference_rotation_matrix_axis_angle,
-        )
-
-        for expt in experiments[1:]:
-            cryst = expt.crystal
-            if params.frame == "crystal":
-                R_ij, axis, angle, cb_op = difference_rotation_matrix_axis_angle(
-                    ref_crystal, cryst
-                )
-                U = R_ij
-            elif params.use_starting_angle:
-                if params.use_starting_angle:
-                    rotation_axis = matrix.col(expt.goniometer.get_rotation_axis())
-                    R = rotation_axis.axis_and_angle_as_r3_rotation_matrix(
-                        expt.scan.get_oscillation()[0], deg=True
-                    )
-            else:
-                U = matrix.sqr(cryst.get_U())
-            reciprocal_space_points = (
-                list(R * U * matrix.sqr(cryst.get_B()))
-                * miller_indices.as_vec3_double()
+    for expt in experiments[1:]:
+        cryst = expt.crystal
+        if params.frame == "crystal":
+            R_ij, axis, angle, cb_op = difference_rotation_matrix_axis_angle(
+                ref_crystal, cryst
             )
-            projections = stereographic_projection(
-                reciprocal_space_points, reference_poles
+            U = R_ij
+        elif params.use_starting_angle:
+            rotation_axis = matrix.col(expt.goniometer.get_rotation_axis())
+            R = rotation_axis.axis_and_angle_as_r3_rotation_matrix(
+                expt.scan.get_oscillation()[0], deg=True
             )
-            projections_all.append(projections)
+        else:
+            U = matrix.sqr(cryst.get_U())
+        matrices.append(R * U * matrix.sqr(cryst.get_B()))
+
+    project = functools.partial(
+        project_miller_indices, hkl_vec3=hkl_vec3, reference_poles=reference_poles
+    )
+    if len(matrices) == 1:
+        projections_all = [project(matrices[0])]
+    else:
+        # the projections for each crystal are independent. Only the numpy
+        # arithmetic in stereographic_projection releases the GIL; the flex matrix
+        # product and the conversions to and from numpy still hold it
+        if params.nproc is libtbx.Auto:
+            params.nproc = libtbx.introspection.number_of_processors()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=params.nproc) as pool:
+            projections_all = list(pool.map(project, matrices))
 
     if params.save_coordinates:
+        # the indices are the same for every crystal, so only format them once
+        hkl_strs = ["%i %i %i" % hkl for hkl in miller_indices]
         with open("projections.txt", "w") as f:
             f.write("crystal h k l x y" + os.linesep)
             for i_cryst, projections in enumerate(projections_all):
-                for hkl, proj in zip(miller_indices, projections):
-                    f.write("%i " % (i_cryst + 1))
-                    f.write("%i %i %i " % hkl)
-                    f.write(("%f %f" + os.linesep) % proj)
+                prefix = "%i " % (i_cryst + 1)
+                f.write(
+                    "".join(
+                        "%s%s %f %f%s" % (prefix, hkl, x, y, os.linesep)
+                        for hkl, (x, y) in zip(hkl_strs, projections)
+                    )
+                )
 
     if params.plot.filename:
         epochs = None
@@ -0,0 +1 @@
+dials.reindex: reindexed reflections are now saved in msgpack format, like other DIALS programs. Set DIALS_USE_PICKLE to save as pickle instead.
@@ -0,0 +1 @@
+dials.stereographic_projection: projections for multiple crystals are now calculated in parallel, using the new nproc parameter to set the number of threads.
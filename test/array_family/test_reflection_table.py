@@ -1179,6 +1179,25 @@ def compare(a, b):
     assert all(tuple(compare(a, b) for a, b in zip(new_table["col11"], c11)))
 
 
+def test_from_file_reads_pickle_and_msgpack(tmpdir):
+    table = flex.reflection_table()
+    table["id"] = flex.int([0, 0, 1])
+    table["intensity.sum.value"] = flex.double([1.0, 2.0, 3.0])
+    table["miller_index"] = flex.miller_index([(1, 0, 0), (0, 1, 0), (0, 0, 1)])
+
+    table.as_pickle(tmpdir.join("reflections.pickle").strpath)
+    table.as_msgpack_file(tmpdir.join("reflections.mpack").strpath)
+    for filename in ("reflections.pickle", "reflections.mpack"):
+        new_table = flex.reflection_table.from_file(tmpdir.join(filename).strpath)
+        assert new_table.is_consistent()
+        assert new_table.nrows() == 3
+        assert list(new_table["id"]) == list(table["id"])
+        assert list(new_table["intensity.sum.value"]) == list(
+            table["intensity.sum.value"]
+        )
+        assert list(new_table["miller_index"]) == list(table["miller_index"])
+
+
 def test_experiment_identifiers():
     from dxtbx.model import Experiment, ExperimentList
 
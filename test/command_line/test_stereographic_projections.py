@@ -1,7 +1,12 @@
 import json
+import math
 
 import procrunner
+import pytest
 
+from scitbx import matrix
+
+from dials.array_family import flex
 from dials.command_line import stereographic_projection
 
 
@@ -59,3 +64,29 @@ def test_labels(dials_data, tmpdir):
             "7",
             "7",
         ]
+
+
+def test_stereographic_projection_values():
+    reference_poles = (
+        matrix.col((0, 0, 1)),
+        matrix.col((1, 0, 0)),
+        matrix.col((0, 1, 0)),
+    )
+    points = flex.vec3_double(
+        [
+            (1, 0, 1),
+            (-1, 0, -1),  # pointing away from r_0, so flipped onto (1, 0, 1)
+            (0, 0, 2),  # along r_0, so projects onto the origin
+            (0, -1, 1),  # negative component along r_2, so y < 0
+        ]
+    )
+    projections = stereographic_projection.stereographic_projection(
+        points, reference_poles
+    )
+    r = math.tan(math.pi / 8)
+    expected = [(r, 0), (r, 0), (0, 0), (0, -r)]
+    assert len(projections) == len(expected)
+    for proj, exp in zip(projections, expected):
+        assert proj == pytest.approx(exp, abs=1e-6)
+    # a flipped point with no component along r_2 must not pick up a negative y
+    assert projections[1][1] >= 0
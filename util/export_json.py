@@ -33,11 +33,16 @@ def as_json(self, filename=None, compact=False, n_digits=None, experiments=None)
         if experiments:
             d["experiments"] = experiments.to_dict()
         if compact:
-            text = json.dumps(d, separators=(",", ":"), ensure_ascii=True)
+            kwargs = {"separators": (",", ":")}
         else:
-            text = json.dumps(d, separators=(",", ": "), indent=1, ensure_ascii=True)
-        if filename is not None:
-            with open(filename, "w") as f:
-                f.write(text)
-        else:
-            return text
+            kwargs = {"separators": (",", ": "), "indent": 1}
+        if filename is None:
+            return json.dumps(d, ensure_ascii=True, **kwargs)
+        with open(filename, "w") as f:
+            if compact:
+                # only json.dumps without indent uses the C encoder, so build the
+                # string and write it once
+                f.write(json.dumps(d, ensure_ascii=True, **kwargs))
+            else:
+                # indented output never uses the C encoder, so stream it to file
+                json.dump(d, f, ensure_ascii=True, **kwargs)
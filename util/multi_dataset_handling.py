@@ -9,6 +9,8 @@
 import logging
 import uuid
 
+import numpy as np
+
 from dials.array_family import flex
 
 logger = logging.getLogger("dials")
@@ -131,6 +133,14 @@ def renumber_table_id_columns(reflection_tables):
     return reflection_tables
 
 
+def _set_id_column(reflection_table, id_):
+    """Set the whole 'id' column to id_, filling the existing column in place."""
+    if "id" in reflection_table:
+        reflection_table["id"].fill(id_)
+    else:
+        reflection_table["id"] = flex.int(reflection_table.size(), id_)
+
+
 def parse_multiple_datasets(reflections):
     """
     Split a list of multi-dataset reflection tables, selecting on id
@@ -148,8 +158,9 @@ def parse_multiple_datasets(reflections):
     single_reflection_tables = []
     dataset_id_list = []
     for refl_table in reflections:
-        dataset_ids = set(refl_table["id"]).difference({-1})
-        dataset_id_list.extend(list(dataset_ids))
+        unique_ids = np.unique(refl_table["id"].as_numpy_array())
+        dataset_ids = unique_ids[unique_ids != -1].tolist()
+        dataset_id_list.extend(dataset_ids)
         if len(dataset_ids) > 1:
             logger.info(
                 "Detected existence of a multi-dataset reflection table \n"
@@ -158,7 +169,7 @@ def parse_multiple_datasets(reflections):
             )
             # FIXME fix split_by_experiment_id so that don't need to filter
             # unindxeded reflections here to get rid of id = -1
-            if -1 in refl_table["id"]:
+            if len(dataset_ids) != len(unique_ids):
                 refl_table = refl_table.select(refl_table["id"] != -1)
             result = refl_table.split_by_experiment_id()
             single_reflection_tables.extend(result)
@@ -173,7 +184,7 @@ def parse_multiple_datasets(reflections):
         for new_id, (r, old_id) in enumerate(
             zip(single_reflection_tables, dataset_id_list)
         ):
-            r["id"] = flex.int(r.size(), new_id)
+            _set_id_column(r, new_id)
             if list(r.experiment_identifiers()):  # if identifiers, need to update
                 expid = r.experiment_identifiers()[old_id]
                 del r.experiment_identifiers()[old_id]
@@ -220,9 +231,9 @@ def assign_unique_identifiers(experiments, reflections, identifiers=None):
             for k in refl.experiment_identifiers().keys():
                 del refl.experiment_identifiers()[k]
             refl.experiment_identifiers()[i] = identifiers[i]
-            refl["id"] = flex.int(refl.size(), i)
+            _set_id_column(refl, i)
     # Validate the existing identifiers, or the ones just set
-    used_str_ids = []
+    used_str_ids = set()
     for exp, refl in zip(experiments, reflections):
         if exp.identifier != "":
             if list(refl.experiment_identifiers().values()) != [exp.identifier]:
@@ -230,9 +241,9 @@ def assign_unique_identifiers(experiments, reflections, identifiers=None):
                     "Corrupted identifiers, please check input: in reflections: %s, in experiment: %s"
                     % (list(refl.experiment_identifiers().values()), exp.identifier)
                 )
-            used_str_ids.append(exp.identifier)
+            used_str_ids.add(exp.identifier)
 
-    if len(set(used_str_ids)) != len(reflections):
+    if len(used_str_ids) != len(reflections):
         # if not all set, then need to fill in the rest. Keep the identifier if
         # it is already set, and reset table id column from 0..n-1
         for i, (exp, refl) in enumerate(zip(experiments, reflections)):
@@ -245,7 +256,7 @@ def assign_unique_identifiers(experiments, reflections, identifiers=None):
                 expid = list(refl.experiment_identifiers().values())[0]
                 del refl.experiment_identifiers()[k]
                 refl.experiment_identifiers()[i] = expid
-            refl["id"] = flex.int(refl.size(), i)
+            _set_id_column(refl, i)
     return experiments, reflections
 
 
@@ -333,9 +344,10 @@ def select_datasets_on_identifiers(
     list_of_reflections = []
     if use_datasets:
         total_found = 0
+        use_datasets_set = set(use_datasets)
         for reflection_table in reflection_table_list:
-            expids = list(reflection_table.experiment_identifiers().values())
-            expids_in_this_table = list(set(use_datasets).intersection(set(expids)))
+            expids = reflection_table.experiment_identifiers().values()
+            expids_in_this_table = list(use_datasets_set.intersection(expids))
             total_found += len(expids_in_this_table)
             if expids_in_this_table:  # if none, then no datasets wanted from table
                 list_of_reflections.append(
@@ -350,16 +362,15 @@ def select_datasets_on_identifiers(
             )
         experiments.select_on_experiment_identifiers(use_datasets)
     elif exclude_datasets:
-        if len(
-            set(exclude_datasets).intersection(set(experiments.identifiers()))
-        ) != len(set(exclude_datasets)):
+        exclude_datasets_set = set(exclude_datasets)
+        if not exclude_datasets_set.issubset(experiments.identifiers()):
             raise ValueError(
                 """Attempting to exclude datasets based on identifiers that
 are not found in the experiment list / reflection tables."""
             )
         for reflection_table in reflection_table_list:
-            expids = list(reflection_table.experiment_identifiers().values())
-            expids_in_this_table = list(set(exclude_datasets).intersection(set(expids)))
+            expids = reflection_table.experiment_identifiers().values()
+            expids_in_this_table = list(exclude_datasets_set.intersection(expids))
             if expids_in_this_table:  # only append if data left after removing
                 r_table = reflection_table.remove_on_experiment_identifiers(
                     expids_in_this_table